@@ -0,0 +1,223 @@
+# assembly_tree.py
+# Tree-parsing core of make_assembly_matrix.py, plus plain-list versions of
+# both tables. Pure Python (stdlib only, so it also runs under PyPy) and fully
+# annotated, so it can optionally be compiled with mypyc:
+#     pip install mypy
+#     mypyc assembly_tree.py
+# The compiled extension lands next to this file and is imported in its place;
+# without it the plain Python module is used.
+
+import re
+import sys
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# ---------------- Utilities ----------------
+
+_TREE_RE = re.compile(r"[├└]─\s*(.*)$")
+
+@lru_cache(maxsize=None)
+def normalize_instance_suffix(name: str) -> str:
+    """Strip trailing 3-digit instance suffix (e.g., Body003 -> Body)."""
+    name = name.strip()
+    # isdecimal() matches the same characters as regex \d
+    # interned (once per distinct input, thanks to the cache) so every
+    # instance of a name is the same object and dict lookups compare by identity
+    return sys.intern(name[:-3] if len(name) >= 3 and name[-3:].isdecimal() else name)
+
+def compute_level(line: str) -> int:
+    """Indent level from index of tree branch glyph (├ or └)."""
+    a = line.find("├")
+    b = line.find("└")
+    idx = a if a >= 0 and (b < 0 or a < b) else b
+    if idx < 0:
+        return 0
+    return ((idx - 1) // 4) + 1
+
+def split_line(line: str) -> Tuple[int, str]:
+    """
+    Return (level, content): the indent level and the stripped text after the
+    '├─'/'└─' glyph (the whole stripped line if there is none). The glyph is
+    located once and reused for both.
+    """
+    a = line.find("├")
+    b = line.find("└")
+    idx = a if a >= 0 and (b < 0 or a < b) else b
+    if idx < 0:
+        return 0, line.strip()
+    lvl = ((idx - 1) // 4) + 1
+    if line.startswith("─", idx + 1):
+        return lvl, line[idx + 2:].strip()
+    # first glyph isn't followed by '─'; a later one may be
+    stripped = line.strip()
+    m = _TREE_RE.search(stripped)
+    return lvl, m.group(1) if m else stripped
+
+def extract_name_and_type(content: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Return (name, kind) where kind in {'assembly', 'part', None}, from the
+    content after the tree glyph as returned by split_line().
+    - Skips 'Constraints'/'Configurations'
+    - Skips 'Circular_*' containers (pattern features, not physical)
+    - Assemblies: '=> Assembly' or ' (Assembly) @'
+    - Parts: '=> Body'/'=> Part' or 'Name (Screw|Nut|Washer|...)'
+    """
+    if content.endswith("Constraints") or content.endswith("Configurations"):
+        return None, None
+
+    # Skip Circular_* containers (content never has leading whitespace here)
+    if content.startswith("Circular_"):
+        return None, None
+
+    # Classify from the positions of the first '=>' and '(' instead of
+    # repeated substring scans and splits.
+    eq = content.find("=>")
+    if eq < 0:
+        # Top header form: "Something (Assembly) @ ..."
+        ap = content.find("(Assembly)")
+        if ap >= 0 and "@" in content:
+            return normalize_instance_suffix(content[:ap]), "assembly"
+    else:
+        if content.startswith(" Assembly", eq + 2):
+            return normalize_instance_suffix(content[:eq]), "assembly"
+        ap = content.find("=> Assembly", eq + 2)   # rare: not the first '=>'
+        if ap >= 0:
+            return normalize_instance_suffix(content[:ap]), "assembly"
+        if (content.startswith((" Body", " Part"), eq + 2)
+                or content.find("=> Body", eq + 2) >= 0 or content.find("=> Part", eq + 2) >= 0):
+            return normalize_instance_suffix(content[:eq]), "part"
+
+    lp = content.find("(")
+    if lp >= 0 and ")" in content:
+        return normalize_instance_suffix(content[:lp]), "part"
+
+    return None, None
+
+# ---------------- Parse tree ----------------
+
+# Edges as parallel arrays (parent_ids, child_ids, counts), one entry per distinct parent/child pair
+Edges = Tuple[List[int], List[int], List[int]]
+
+def _count_edge(edges: Edges, index: Dict[Tuple[int, int], int], parent: int, child: int) -> None:
+    key = (parent, child)
+    e = index.get(key)
+    if e is None:
+        index[key] = len(edges[2])
+        edges[0].append(parent)
+        edges[1].append(child)
+        edges[2].append(1)
+    else:
+        edges[2][e] += 1
+
+def parse_tree(lines: Iterable[str]) -> Tuple[List[str], List[str], Edges, Edges]:
+    """
+    Return (names, kinds, direct, subasms). Every item gets a dense int id:
+    - names[id], kinds[id]: item name and 'assembly'/'part'
+    - direct: edges to all direct children
+    - subasms: edges to children that appeared as assemblies
+    """
+    names: List[str] = []           # id -> item name
+    kinds: List[str] = []           # id -> 'assembly'/'part'
+    name_to_id: Dict[str, int] = {}
+    direct: Edges = ([], [], [])
+    subasms: Edges = ([], [], [])
+    direct_index: Dict[Tuple[int, int], int] = {}   # (parent, child) -> position in direct
+    subasm_index: Dict[Tuple[int, int], int] = {}
+    stack: List[Tuple[int, int]] = []  # stack of (assembly_id, level)
+
+    for ln in lines:
+        lvl, content = split_line(ln)
+        if not content and not ln.strip():   # blank line (a bare glyph still resets the stack)
+            continue
+        name, kind = extract_name_and_type(content)
+
+        # pop to current level
+        while stack and stack[-1][1] >= lvl:
+            stack.pop()
+
+        if name is None:
+            continue
+
+        # record kind (prefer 'assembly' if both ever seen)
+        nid = name_to_id.get(name)
+        if nid is None:
+            nid = name_to_id[name] = len(names)
+            names.append(name)
+            kinds.append(kind or "part")
+        elif kind == "assembly":
+            kinds[nid] = "assembly"
+
+        if stack:
+            parent = stack[-1][0]
+            _count_edge(direct, direct_index, parent, nid)
+            if kind == "assembly":
+                _count_edge(subasms, subasm_index, parent, nid)
+        if kind == "assembly":
+            stack.append((nid, lvl))
+
+    return names, kinds, direct, subasms
+
+# ---------------- Tables (plain Python) ----------------
+
+Table = Tuple[List[str], List[List[object]]]    # (header, rows)
+
+def sorted_ids(names: List[str], kinds: List[str], kind: Optional[str] = None) -> List[int]:
+    """Item ids ordered by name, optionally only those of one kind."""
+    ids: Iterable[int] = range(len(names)) if kind is None else [i for i, k in enumerate(kinds) if k == kind]
+    return sorted(ids, key=names.__getitem__)
+
+def assembly_order(names: List[str], kinds: List[str], subasms: Edges) -> List[int]:
+    """Assembly ids leaves first (Kahn's topological sort); ValueError if the tree has a cycle."""
+    asm_ids = sorted_ids(names, kinds, "assembly")
+    # an assembly is ready once all of its sub-assemblies have been rolled up
+    pending = [0] * len(names)
+    parents: List[List[int]] = [[] for _ in names]
+    for p, c in zip(subasms[0], subasms[1]):
+        pending[p] += 1
+        parents[c].append(p)
+    order = [a for a in asm_ids if pending[a] == 0]
+    for a in order:  # grows while we walk it
+        for p in parents[a]:
+            pending[p] -= 1
+            if pending[p] == 0:
+                order.append(p)
+    if len(order) < len(asm_ids):
+        stuck = sorted(names[a] for a in asm_ids if pending[a] > 0)
+        raise ValueError(f"Assembly tree contains a cycle through: {', '.join(stuck)}")
+    return order
+
+def direct_children_table(names: List[str], kinds: List[str], direct: Edges) -> Table:
+    """DirectChildren sheet: assemblies then parts (each by name) x assemblies."""
+    asm_ids = sorted_ids(names, kinds, "assembly")
+    col = {a: j for j, a in enumerate(asm_ids)}
+    counts: List[List[int]] = [[0] * len(asm_ids) for _ in names]
+    for p, c, n in zip(direct[0], direct[1], direct[2]):
+        counts[c][col[p]] = n
+    rows: List[List[object]] = []
+    for i in asm_ids + sorted_ids(names, kinds, "part"):
+        row: List[object] = [names[i], kinds[i]]
+        row.extend(counts[i])
+        rows.append(row)
+    return ["Item", "Kind"] + [names[a] for a in asm_ids], rows
+
+def rollup_parts_table(names: List[str], kinds: List[str], direct: Edges, subasms: Edges) -> Table:
+    """RollupPartsOnly sheet: parts x assemblies, including nested sub-assemblies."""
+    asm_ids = sorted_ids(names, kinds, "assembly")
+    totals: List[Dict[int, int]] = [{} for _ in names]   # assembly id -> {part id: count}
+    for p, c, n in zip(direct[0], direct[1], direct[2]):
+        if kinds[c] == "part":   # direct parts only
+            totals[p][c] = n
+    children: List[List[Tuple[int, int]]] = [[] for _ in names]
+    for p, c, n in zip(subasms[0], subasms[1], subasms[2]):
+        children[p].append((c, n))
+    for a in assembly_order(names, kinds, subasms):
+        total = totals[a]
+        for sub, n in children[a]:
+            for part, cnt in totals[sub].items():
+                total[part] = total.get(part, 0) + cnt * n
+    rows: List[List[object]] = []
+    for i in sorted_ids(names, kinds, "part"):
+        row: List[object] = [names[i]]
+        row.extend([totals[a].get(i, 0) for a in asm_ids])
+        rows.append(row)
+    return ["Item"] + [names[a] for a in asm_ids], rows
@@ -1,163 +1,96 @@
 #!/usr/bin/env python3
 # make_assembly_matrix.py
 # Usage: python make_assembly_matrix.py tree_<19Jan2025>.txt ##change name of file to process accordingly.
+#        pypy3 make_assembly_matrix.py tree_<19Jan2025>.txt --emit json   (or csv; no pandas/numpy needed)
 
-import sys, re, os
-from collections import defaultdict, Counter
-from functools import lru_cache
+import sys, os, argparse, csv, json
+from pathlib import Path
 
+# Only the spreadsheet output needs numpy/pandas; --emit json/csv runs without
+# them (e.g. under PyPy).
 try:
+    import numpy as np
     import pandas as pd
-except Exception as e:
-    raise SystemExit("Please install pandas: pip install pandas") from e
-
-# ---------------- Utilities ----------------
-
-def normalize_instance_suffix(name: str) -> str:
-    """Strip trailing 3-digit instance suffix (e.g., Body003 -> Body)."""
-    name = name.strip()
-    m = re.match(r"^(.*?)(\d{3})$", name)
-    return m.group(1) if m else name
-
-def compute_level(line: str) -> int:
-    """Indent level from index of tree branch glyph (├ or └)."""
-    idxs = [i for i in (line.find("├"), line.find("└")) if i >= 0]
-    if not idxs:
-        return 0
-    idx = min(idxs)
-    return ((idx - 1) // 4) + 1
-
-def extract_name_and_type(line: str):
-    """
-    Return (name, kind) where kind in {'assembly', 'part', None}.
-    - Skips 'Constraints'/'Configurations'
-    - Skips 'Circular_*' containers (pattern features, not physical)
-    - Assemblies: '=> Assembly' or ' (Assembly) @'
-    - Parts: '=> Body'/'=> Part' or 'Name (Screw|Nut|Washer|...)'
-    """
-    stripped = line.strip()
-    if stripped.endswith("Constraints") or stripped.endswith("Configurations"):
-        return None, None
-
-    m = re.search(r"[├└]─\s*(.*)$", stripped)
-    content = m.group(1) if m else stripped
-
-    # Top header form: "Something (Assembly) @ ..."
-    if "(Assembly)" in content and "@" in content and "=>" not in content:
-        name = content.split("(Assembly)")[0].strip()
-        base = normalize_instance_suffix(name)
-        if base.startswith("Circular_"):
-            return None, None
-        return base, "assembly"
-
-    # Skip Circular_* containers
-    lead = content.split("=>")[0].split("(")[0].strip()
-    if lead.startswith("Circular_"):
-        return None, None
-
-    if "=> Assembly" in content:
-        name = content.split("=> Assembly")[0].strip()
-        return normalize_instance_suffix(name), "assembly"
-
-    if "=> Body" in content or "=> Part" in content:
-        name = content.split("=>")[0].strip()
-        return normalize_instance_suffix(name), "part"
-
-    if "(" in content and ")" in content:
-        name = content.split("(")[0].strip()
-        return normalize_instance_suffix(name), "part"
-
-    return None, None
-
-# ---------------- Parse tree ----------------
-
-def parse_tree(lines):
-    assembly_children_direct = defaultdict(Counter)   # asm -> Counter(item -> count); direct children only
-    assembly_children_assemblies = defaultdict(Counter)  # asm -> Counter(subasm -> count)
-    item_kinds = {}  # item -> 'assembly'/'part'
-    stack = []       # stack of (assembly_name, level)
-
-    for ln in lines:
-        if not ln.strip():
-            continue
-        lvl = compute_level(ln)
-        name, kind = extract_name_and_type(ln)
-
-        # pop to current level
-        while stack and stack[-1][1] >= lvl:
-            stack.pop()
-
-        if name is None:
-            continue
-
-        # record kind (prefer 'assembly' if both ever seen)
-        if name in item_kinds:
-            if item_kinds[name] != "assembly" and kind == "assembly":
-                item_kinds[name] = "assembly"
-        else:
-            item_kinds[name] = kind or "part"
-
-        if kind == "assembly":
-            if stack:
-                parent = stack[-1][0]
-                assembly_children_direct[parent][name] += 1
-                assembly_children_assemblies[parent][name] += 1
-            stack.append((name, lvl))
-        else:
-            if stack:
-                parent = stack[-1][0]
-                assembly_children_direct[parent][name] += 1
-
-    all_assemblies = sorted(
-        set(assembly_children_direct.keys()) |
-        {n for n,k in item_kinds.items() if k == "assembly"}
-    )
-    return assembly_children_direct, assembly_children_assemblies, item_kinds, all_assemblies
+except ImportError:
+    np = pd = None
+
+# Hot parsing loop lives in its own module so it can be compiled with mypyc
+from assembly_tree import (normalize_instance_suffix, compute_level, split_line, extract_name_and_type, parse_tree,
+                           sorted_ids, assembly_order, direct_children_table, rollup_parts_table)
 
 # ---------------- Build tables ----------------
 
-def build_direct_children_df(assembly_children_direct, item_kinds, all_assemblies):
-    all_items = sorted(item_kinds.keys())
-    rows = []
-    for item in all_items:
-        row = {"Item": item, "Kind": item_kinds.get(item, "part")}
-        for asm in all_assemblies:
-            row[asm] = assembly_children_direct[asm].get(item, 0)
-        rows.append(row)
-    df = pd.DataFrame(rows)
-    df["_k"] = df["Kind"].map({"assembly": 0, "part": 1}).fillna(1)
-    df = df.sort_values(["_k", "Item"]).drop(columns=["_k"]).reset_index(drop=True)
+def _positions(ids, size):
+    """Array mapping item id -> position in ids (-1 if absent)."""
+    pos = np.full(size, -1, dtype=np.intp)
+    pos[np.asarray(ids, dtype=np.intp)] = np.arange(len(ids))
+    return pos
+
+def _edge_arrays(edges):
+    parent, child, count = edges
+    return np.array(parent, dtype=np.intp), np.array(child, dtype=np.intp), np.array(count, dtype=np.int64)
+
+def build_direct_children_df(names, kinds, direct):
+    # assemblies first, then parts, each by name: ids are already name-sorted,
+    # so a stable argsort on the kind flag gives the final row order
+    by_name = np.asarray(sorted_ids(names, kinds), dtype=np.intp)
+    is_part = np.array([kinds[i] != "assembly" for i in by_name.tolist()], dtype=np.int8)
+    item_ids = by_name[np.argsort(is_part, kind="stable")].tolist()
+    asm_ids = sorted_ids(names, kinds, "assembly")
+    row = _positions(item_ids, len(names))
+    col = _positions(asm_ids, len(names))
+    parent, child, count = _edge_arrays(direct)
+    # items x assemblies count matrix; (parent, child) pairs are unique, so one scatter fills it
+    mat = np.zeros((len(item_ids), len(asm_ids)), dtype=np.int32)
+    mat[row[child], col[parent]] = count
+    # wrap the int32 block as-is and hand over the label columns as typed
+    # arrays, so pandas has nothing left to infer
+    df = pd.DataFrame(mat, columns=[names[i] for i in asm_ids], copy=False)
+    df.insert(0, "Item", np.array([names[i] for i in item_ids], dtype=object))
+    df.insert(1, "Kind", np.array([kinds[i] for i in item_ids], dtype=object))
     return df
 
-def build_rollup_parts_df(assembly_children_direct, assembly_children_assemblies, item_kinds, all_assemblies):
-    # direct parts only
-    assembly_direct_parts = {
-        asm: Counter({it:c for it,c in ctr.items() if item_kinds.get(it) != "assembly"})
-        for asm, ctr in assembly_children_direct.items()
-    }
-
-    @lru_cache(maxsize=None)
-    def rollup_parts_for(asm: str) -> Counter:
-        total = Counter(assembly_direct_parts.get(asm, Counter()))
-        for subasm, n in assembly_children_assemblies.get(asm, Counter()).items():
-            child = rollup_parts_for(subasm)
-            for it, c in child.items():
-                total[it] += c * n
-        return total
-
-    all_parts = sorted([n for n,k in item_kinds.items() if k == "part"])
-    rows = []
-    for item in all_parts:
-        row = {"Item": item}
-        for asm in all_assemblies:
-            row[asm] = rollup_parts_for(asm).get(item, 0)
-        rows.append(row)
-    df = pd.DataFrame(rows).sort_values("Item").reset_index(drop=True)
+def build_rollup_parts_df(names, kinds, direct, subasms):
+    part_ids = sorted_ids(names, kinds, "part")
+    asm_ids = sorted_ids(names, kinds, "assembly")
+    row = _positions(part_ids, len(names))
+    col = _positions(asm_ids, len(names))
+    rank = _positions(assembly_order(names, kinds, subasms), len(names))   # leaves first
+
+    # parts x assemblies; column-major so each assembly's column is contiguous
+    mat = np.zeros((len(part_ids), len(asm_ids)), dtype=np.int64, order="F")
+    parent, child, count = _edge_arrays(direct)
+    is_part = row[child] >= 0   # direct parts only
+    mat[row[child[is_part]], col[parent[is_part]]] = count[is_part]
+    # add each sub-assembly's column into its parent's, children before parents
+    parent, child, count = _edge_arrays(subasms)
+    by_rank = np.argsort(rank[parent], kind="stable")
+    for p, c, n in zip(col[parent[by_rank]].tolist(), col[child[by_rank]].tolist(), count[by_rank].tolist()):
+        mat[:, p] += n * mat[:, c]
+
+    df = pd.DataFrame(mat, columns=[names[i] for i in asm_ids], copy=False)
+    df.insert(0, "Item", np.array([names[i] for i in part_ids], dtype=object))
     return df
 
-# ---------------- Save ODS (with XLSX fallback) ----------------
+# ---------------- Save XLSX / ODS ----------------
 
 def save_ods(dfs, out_path_ods, out_path_xlsx):
+    # Fast path: xlsxwriter streams each row straight to XML instead of
+    # building a per-cell DOM; constant_memory flushes every finished row,
+    # so memory stays O(row).
+    try:
+        import xlsxwriter
+    except ImportError:
+        xlsxwriter = None
+    if xlsxwriter is not None:
+        with xlsxwriter.Workbook(out_path_xlsx, {"constant_memory": True}) as wb:
+            for sheet_name, df in dfs.items():
+                ws = wb.add_worksheet(str(sheet_name)[:31])
+                ws.write_row(0, 0, [str(h) for h in df.columns])
+                for r, row in enumerate(df.itertuples(index=False, name=None), 1):
+                    ws.write_row(r, 0, row)
+        return out_path_xlsx
+
     try:
         from odf.opendocument import OpenDocumentSpreadsheet
         from odf.table import Table, TableRow, TableCell
@@ -171,12 +104,12 @@ def save_ods(dfs, out_path_ods, out_path_xlsx):
             for h in df.columns:
                 c = TableCell(valuetype="string"); c.addElement(P(text=str(h))); tr.addElement(c)
             t.addElement(tr)
-            # rows
-            for _, r in df.iterrows():
+            # rows (column types decided once, not per cell)
+            num_cols = {i for i, dt in enumerate(df.dtypes) if pd.api.types.is_numeric_dtype(dt)}
+            for r in df.itertuples(index=False, name=None):
                 tr = TableRow()
-                for h in df.columns:
-                    v = r[h]
-                    if isinstance(v, (int, float)) and pd.notna(v):
+                for i, v in enumerate(r):
+                    if i in num_cols and v == v:  # NaN != NaN
                         c = TableCell(valuetype="float", value=float(v))
                     else:
                         c = TableCell(valuetype="string"); c.addElement(P(text="" if pd.isna(v) else str(v)))
@@ -186,29 +119,67 @@ def save_ods(dfs, out_path_ods, out_path_xlsx):
         doc.save(out_path_ods)
         return out_path_ods
     except Exception:
-        # Fallback to XLSX
-        with pd.ExcelWriter(out_path_xlsx, engine="openpyxl") as w:
-            for name, df in dfs.items():
-                df.to_excel(w, sheet_name=name, index=False)
+        # Fallback to XLSX; write-only mode streams rows rather than keeping a Cell object per value
+        from openpyxl import Workbook
+
+        wb = Workbook(write_only=True)
+        for sheet_name, df in dfs.items():
+            ws = wb.create_sheet(str(sheet_name)[:31])
+            ws.append([str(h) for h in df.columns])
+            for r in df.itertuples(index=False, name=None):
+                ws.append(r)
+        wb.save(out_path_xlsx)
         return out_path_xlsx
 
+# ---------------- Save JSON / CSV (no pandas) ----------------
+
+def save_json(tables, out_path):
+    with open(out_path, "w", encoding="utf-8") as fh:
+        json.dump({name: {"columns": header, "rows": rows} for name, (header, rows) in tables.items()},
+                  fh, ensure_ascii=False)
+    return out_path
+
+def save_csv(tables, out_stem):
+    """One CSV per sheet: <out_stem>_<sheet>.csv"""
+    paths = []
+    for name, (header, rows) in tables.items():
+        path = f"{out_stem}_{name}.csv"
+        with open(path, "w", encoding="utf-8", newline="") as fh:
+            w = csv.writer(fh)
+            w.writerow(header)
+            w.writerows(rows)
+        paths.append(path)
+    return ", ".join(paths)
+
 # ---------------- Main ----------------
 
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: python make_assembly_matrix.py tree_19Jan2025.txt")
-        sys.exit(1)
-    in_path = sys.argv[1]
-    with open(in_path, "r", encoding="utf-8") as fh:
-        lines = [ln.rstrip("\n") for ln in fh]
-
-    direct, subasms, kinds, assemblies = parse_tree(lines)
-    df_direct = build_direct_children_df(direct, kinds, assemblies)
-    df_rollup = build_rollup_parts_df(direct, subasms, kinds, assemblies)
-
-    out_ods  = os.path.join(os.path.dirname(in_path) or ".", "assembly_matrix.ods")
-    out_xlsx = os.path.join(os.path.dirname(in_path) or ".", "assembly_matrix.xlsx")
-    saved = save_ods({"DirectChildren": df_direct, "RollupPartsOnly": df_rollup}, out_ods, out_xlsx)
+    ap = argparse.ArgumentParser(description="Build part/assembly matrices from a FreeCAD assembly tree (.txt).")
+    ap.add_argument("tree", help="assembly tree export, e.g. tree_19Jan2025.txt")
+    ap.add_argument("--emit", choices=("sheet", "json", "csv"), default="sheet",
+                    help="sheet: XLSX/ODS, needs pandas (default); json/csv: plain Python, runs under PyPy")
+    args = ap.parse_args()
+    in_path = args.tree
+    # text mode already folds \r\n and \r into \n, so this gives the same
+    # lines as iterating the file, minus the per-line rstrip copies
+    lines = Path(in_path).read_text(encoding="utf-8").split("\n")
+
+    names, kinds, direct, subasms = parse_tree(lines)
+    out_stem = os.path.join(os.path.dirname(in_path) or ".", "assembly_matrix")
+
+    if args.emit == "sheet":
+        if pd is None:
+            raise SystemExit("Please install pandas: pip install pandas (or use --emit json / --emit csv)")
+        df_direct = build_direct_children_df(names, kinds, direct)
+        df_rollup = build_rollup_parts_df(names, kinds, direct, subasms)
+        saved = save_ods({"DirectChildren": df_direct, "RollupPartsOnly": df_rollup},
+                         out_stem + ".ods", out_stem + ".xlsx")
+    else:
+        tables = {
+            "DirectChildren": direct_children_table(names, kinds, direct),
+            "RollupPartsOnly": rollup_parts_table(names, kinds, direct, subasms),
+        }
+        saved = save_json(tables, out_stem + ".json") if args.emit == "json" else save_csv(tables, out_stem)
 
     print("Wrote:", saved)
     print("Sheets:")
@@ -10,7 +10,9 @@
 # Shows friendly "Intent" and "Example" for the selected fit type.
 # Author: ChatGPT (Atria)
 
+import bisect
 import tkinter as tk
+from functools import lru_cache
 from tkinter import ttk, messagebox
 
 # -------------------------- ISO 286 helpers --------------------------
@@ -61,17 +63,34 @@ SHAFT_FUND_DEV_EI_UM = [
     (450,500,{"k":5,"m":23, "n":40, "p":68, "r":132,"s":252,"u":540}),
 ]
 
+# Band upper limits for bisect; bands are contiguous (each 'over' is the previous 'upto').
+_BAND_UPTO = [upto for _over, upto, _row in SHAFT_FUND_DEV_EI_UM]
+
+# ei already converted to mm for every (shaft letter, band index), built once at import.
+_SHAFT_EI_MM = {
+    (letter, bi): ei_um / 1000.0
+    for bi, (_over, _upto, row) in enumerate(SHAFT_FUND_DEV_EI_UM)
+    for letter, ei_um in row.items()
+}
+
+def _band_index(D_mm: float):
+    """Index of the SHAFT_FUND_DEV_EI_UM band with over < D <= upto, or None outside the table."""
+    i = bisect.bisect_left(_BAND_UPTO, D_mm)   # first band with D <= upto
+    if i < len(SHAFT_FUND_DEV_EI_UM) and D_mm > SHAFT_FUND_DEV_EI_UM[i][0]:
+        return i
+    return None
+
 def shaft_ei_um(letter: str, D_mm: float) -> float:
     """Return fundamental deviation ei (µm) for shaft letter among {h, js, k, m, n, p, r, s, u} at size D."""
     letter = letter.lower()
     if letter in ("h", "js"):
         # These are handled analytically later (0 / symmetric), no table needed
         return 0.0
-    for over, upto, row in SHAFT_FUND_DEV_EI_UM:
-        if D_mm > over and D_mm <= upto:
-            if letter in row:
-                return row[letter]
-            break
+    bi = _band_index(D_mm)
+    if bi is not None:
+        row = SHAFT_FUND_DEV_EI_UM[bi][2]
+        if letter in row:
+            return row[letter]
     raise ValueError(f"No fundamental deviation data for letter '{letter}' at size {D_mm} mm")
 
 # -------------------------- Fit presets (friendly) --------------------------
@@ -123,6 +142,8 @@ FRIENDLY_MAP = [
         "H7/u6")),
 ]
 
+_FIT_BY_NAME = {friendly: params for friendly, params in FRIENDLY_MAP}
+
 SHAPES = ["Cylindrical (shaft in hole)", "Rectangular/Square (plug in slot)"]
 
 # -------------------------- Utility --------------------------
@@ -158,8 +179,9 @@ def shaft_limits(letter: str, IT: int, D: float):
     elif l == "js":
         ei, es = -T/2.0, +T/2.0         # symmetric
     elif l in ("k","m","n","p","r","s","u"):
-        ei_um = shaft_ei_um(l, D)       # nearest-zero deviation in µm
-        ei = ei_um / 1000.0             # → mm
+        ei = _SHAFT_EI_MM.get((l, _band_index(D)))  # nearest-zero deviation, already in mm
+        if ei is None:
+            raise ValueError(f"No fundamental deviation data for letter '{l}' at size {D} mm")
         es = ei + T                     # zone above zero
     else:
         raise ValueError(f"Unsupported shaft letter: {letter}")
@@ -177,8 +199,102 @@ def compute_axis(D: float, hole_letter: str, hole_IT: int, shaft_letter: str, sh
         "min_clear": min_clear, "max_clear": max_clear,
     }
 
+# -------------------------- Batch (many sizes at once) --------------------------
+# For "all sizes for this fit" tables. NumPy/Numba are imported lazily so the GUI never loads them.
+
+AXIS_FIELDS = ("D", "hole_lo", "hole_hi", "hole_T", "shaft_lo", "shaft_hi", "shaft_T", "min_clear", "max_clear")
+_HOLE_CODE = {"H": 0, "JS": 1}
+_SHAFT_CODE = {"h": 0, "js": 1, "k": 2, "m": 3, "n": 4, "p": 5, "r": 6, "s": 7, "u": 8}
+_axis_kernel = None     # Numba-compiled _axis_kernel_py on first use; False if Numba is not installed
+
+def _axis_kernel_py(Ds, bands, hole_code, hole_coeff, shaft_code, shaft_coeff, ei_mm, out):
+    """Fill out[k, :] with the AXIS_FIELDS for Ds[k]; same arithmetic as compute_axis."""
+    for k in range(Ds.shape[0]):
+        D = Ds[k]
+        i_um = 0.45 * (D ** (1.0/3.0)) + 0.001 * D
+        Th = (hole_coeff * i_um) / 1000.0
+        Ts = (shaft_coeff * i_um) / 1000.0
+        if hole_code == 0:
+            h_ei, h_es = 0.0, Th
+        else:
+            h_ei, h_es = -Th/2.0, +Th/2.0
+        if shaft_code == 0:
+            s_ei, s_es = -Ts, 0.0
+        elif shaft_code == 1:
+            s_ei, s_es = -Ts/2.0, +Ts/2.0
+        else:
+            s_ei = ei_mm[bands[k], shaft_code - 2]
+            s_es = s_ei + Ts
+        h_lo, h_hi = D + h_ei, D + h_es
+        s_lo, s_hi = D + s_ei, D + s_es
+        out[k, 0] = D
+        out[k, 1] = h_lo
+        out[k, 2] = h_hi
+        out[k, 3] = Th
+        out[k, 4] = s_lo
+        out[k, 5] = s_hi
+        out[k, 6] = Ts
+        out[k, 7] = h_lo - s_hi
+        out[k, 8] = h_hi - s_lo
+
+def _get_axis_kernel():
+    global _axis_kernel
+    if _axis_kernel is None:
+        try:
+            from numba import njit
+        except ImportError:
+            _axis_kernel = False
+        else:
+            _axis_kernel = njit(cache=True)(_axis_kernel_py)
+    return _axis_kernel
+
+def compute_axis_batch(Ds, hole_letter: str, hole_IT: int, shaft_letter: str, shaft_IT: int):
+    """compute_axis for many sizes at once; returns a NumPy structured array with AXIS_FIELDS.
+
+    Runs a Numba-compiled kernel when numba is installed, otherwise calls compute_axis per size.
+    """
+    import numpy as np
+
+    Ds = np.asarray(Ds, dtype=np.float64).reshape(-1)
+    if not (Ds > 0.0).all():
+        raise ValueError("All sizes must be > 0")
+    hole_code = _HOLE_CODE.get(hole_letter.upper())
+    if hole_code is None:
+        raise ValueError(f"Unsupported hole letter: {hole_letter}")
+    shaft_code = _SHAFT_CODE.get(shaft_letter.lower())
+    if shaft_code is None:
+        raise ValueError(f"Unsupported shaft letter: {shaft_letter}")
+    hole_coeff = IT_COEFF.get(int(hole_IT))
+    shaft_coeff = IT_COEFF.get(int(shaft_IT))
+    for IT, coeff in ((hole_IT, hole_coeff), (shaft_IT, shaft_coeff)):
+        if coeff is None:
+            raise ValueError(f"Unsupported IT grade: {IT}")
+
+    out = np.empty((Ds.shape[0], len(AXIS_FIELDS)), dtype=np.float64)
+    kernel = _get_axis_kernel()
+    if kernel:
+        bands = np.searchsorted(np.asarray(_BAND_UPTO, dtype=np.float64), Ds, side="left")
+        if shaft_code >= 2:
+            over = np.asarray([o for o, _u, _r in SHAFT_FUND_DEV_EI_UM] + [np.inf], dtype=np.float64)
+            bad = (bands >= len(SHAFT_FUND_DEV_EI_UM)) | (Ds <= over[bands])
+            if bad.any():
+                D_bad = float(Ds[bad.argmax()])
+                raise ValueError(f"No fundamental deviation data for letter '{shaft_letter.lower()}' at size {D_bad} mm")
+        letters = ("k", "m", "n", "p", "r", "s", "u")
+        ei_mm = np.array([[_SHAFT_EI_MM[(l, bi)] for l in letters] for bi in range(len(SHAFT_FUND_DEV_EI_UM))])
+        kernel(Ds, bands, hole_code, float(hole_coeff), shaft_code, float(shaft_coeff), ei_mm, out)
+    else:
+        for k, D in enumerate(Ds.tolist()):
+            res = compute_axis(D, hole_letter, hole_IT, shaft_letter, shaft_IT)
+            out[k] = [res[f] for f in AXIS_FIELDS]
+    return out.view(np.dtype([(f, np.float64) for f in AXIS_FIELDS])).reshape(-1)
+
 # -------------------------- GUI --------------------------
 
+# Repeated Compute clicks / toggling between sizes reuse earlier results.
+# The GUI only reads these dicts, so sharing them is safe.
+_compute_axis_cached = lru_cache(maxsize=256)(compute_axis)
+
 class FitsApp(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -191,6 +307,7 @@ class FitsApp(tk.Tk):
         self.diam_var = tk.StringVar(value="34.0")
         self.w_var = tk.StringVar(value="34.0")
         self.h_var = tk.StringVar(value="34.0")
+        self._last_key = None   # inputs behind the results currently shown
 
         self._build_ui()
         self._on_shape_change()
@@ -276,10 +393,10 @@ class FitsApp(tk.Tk):
 
     def _get_fit_record(self):
         name = self.fit_var.get()
-        for friendly, params in FRIENDLY_MAP:
-            if friendly == name:
-                (hole_letter, hole_IT, shaft_letter, shaft_IT, intent, example) = params
-                return friendly, hole_letter, hole_IT, shaft_letter, shaft_IT, intent, example
+        params = _FIT_BY_NAME.get(name)
+        if params is not None:
+            (hole_letter, hole_IT, shaft_letter, shaft_IT, intent, example) = params
+            return name, hole_letter, hole_IT, shaft_letter, shaft_IT, intent, example
         # Fallback
         return ("Locational clearance (snug)", "H", 7, "h", 6,
                 "Accurate location; easy assembly", "Dowel-like location without press")
@@ -297,19 +414,27 @@ class FitsApp(tk.Tk):
 
             if shape.startswith("Cylindrical"):
                 D = parse_pos_float(self.diam_var.get(), "Diameter")
-                res = compute_axis(D, hole_letter, hole_IT, shaft_letter, shaft_IT)
+                key = (shape, friendly, D)
+                if key == self._last_key:
+                    return              # already showing these results
+                res = _compute_axis_cached(D, hole_letter, hole_IT, shaft_letter, shaft_IT)
                 callout = f"⌀{fmt(D)} {hole_letter}{hole_IT}/{shaft_letter}{shaft_IT}"
                 letters = f"Hole: {hole_letter}{hole_IT}   Shaft: {shaft_letter}{shaft_IT}"
                 self._show_results(callout, letters, res, shape="cyl")
+                self._last_key = key
 
             else:
                 W = parse_pos_float(self.w_var.get(), "Width")
                 H = parse_pos_float(self.h_var.get(), "Height")
-                resW = compute_axis(W, hole_letter, hole_IT, shaft_letter, shaft_IT)
-                resH = compute_axis(H, hole_letter, hole_IT, shaft_letter, shaft_IT)
+                key = (shape, friendly, W, H)
+                if key == self._last_key:
+                    return
+                resW = _compute_axis_cached(W, hole_letter, hole_IT, shaft_letter, shaft_IT)
+                resH = _compute_axis_cached(H, hole_letter, hole_IT, shaft_letter, shaft_IT)
                 callout = f"Rectangular plug — Width: {fmt(W)} {hole_letter}{hole_IT}/{shaft_letter}{shaft_IT},  Height: {fmt(H)} {hole_letter}{hole_IT}/{shaft_letter}{shaft_IT}"
                 letters = f"Hole: {hole_letter}{hole_IT}   Shaft: {shaft_letter}{shaft_IT}  (applied on both axes)"
                 self._show_results(callout, letters, (resW, resH), shape="rect")
+                self._last_key = key
 
         except ValueError as ex:
             messagebox.showerror("Input error", str(ex))
@@ -320,9 +445,6 @@ class FitsApp(tk.Tk):
         self.callout_val.configure(text=callout)
         self.letters_val.configure(text=letters)
 
-        self.res_text.configure(state="normal")
-        self.res_text.delete("1.0", "end")
-
         if shape == "cyl":
             R = res
             body = []
@@ -333,7 +455,6 @@ class FitsApp(tk.Tk):
             body.append(f"Clearance:    min {fmt(R['min_clear'])}   max {fmt(R['max_clear'])}  mm")
             body.append("")
             body.append(f"Tolerances:   Hole {fmt(R['hole_T'],6)} mm,  Shaft {fmt(R['shaft_T'],6)} mm")
-            self.res_text.insert("1.0", "\n".join(body))
 
         else:
             RW, RH = res
@@ -350,8 +471,9 @@ class FitsApp(tk.Tk):
             body.append(f"  Clearance:    min {fmt(RH['min_clear'])}   max {fmt(RH['max_clear'])}  mm")
             body.append("")
             body.append(f"Tolerances per axis:   Hole {fmt(RW['hole_T'],6)} mm,  Shaft {fmt(RW['shaft_T'],6)} mm")
-            self.res_text.insert("1.0", "\n".join(body))
 
+        self.res_text.configure(state="normal")
+        self.res_text.replace("1.0", "end", "\n".join(body))
         self.res_text.configure(state="disabled")
 
 